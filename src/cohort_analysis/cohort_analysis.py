@@ -1,34 +1,34 @@
-import asyncio
-import heapq
+import re
 import warnings
-from collections import defaultdict
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from loguru import logger
 from pathlib import Path
 from typing import List, Tuple, Union
+from urllib.parse import quote_plus
 from cube_config.cube_configuration import CubeConfig
 
-import nltk
 import numpy as np
 import pandas as pd
-from src.common.common import ensure_dir_exists, min_max_normalize_sklearn
-from src.common.constants import DATA_DIRECTORY_PATH, COHORT_ANALYSIS_DIRECTORY_PATH, EVERGREEN_KEYWORDS, TRIOMES
+from src.common.common import ensure_dir_exists, min_max_normalize
+from src.common.constants import (DATA_DIRECTORY_PATH, COHORT_ANALYSIS_DIRECTORY_PATH, CSV_READER_MAX_WORKERS,
+                                  EVERGREEN_KEYWORDS, TRIOMES)
 from src.common.args import process_args
 from src.pipeline_object.pipeline_object import PipelineObject
 
 from src.data_generated_cube.elo.elo_fetcher import ELOFetcher
 
-try:
-    from nltk.tokenize import sent_tokenize, word_tokenize
-except:
-    nltk.download('punkt')
-    from nltk.tokenize import sent_tokenize, word_tokenize
-
 warnings.simplefilter("ignore", category=UserWarning)
 
 
 class CohortAnalyzer(PipelineObject):
     evergreen_keywords = EVERGREEN_KEYWORDS
     triomes = TRIOMES
+    oracle_token_pattern = re.compile(r"\w+")
+    keyword_phrases = {'you become the monarch': 'Monarch', 'Ring tempts you': 'The Ring tempts you'}
+    keyword_phrase_pattern = re.compile('|'.join(map(re.escape, keyword_phrases)))
+    cube_csv_columns = ['name', 'CMC', 'Type']
+    cube_csv_dtypes = {'name': str, 'Type': str}
 
     @process_args
     def __init__(self, config: Union[str, CubeConfig]):
@@ -36,7 +36,12 @@ class CohortAnalyzer(PipelineObject):
         self._set_data_dir(self.config.cubeName)
         self._set_analysis_directory(self.config.cubeName)
         self._set_cube_name_map()
-        self.elo_fetcher = ELOFetcher()
+        self.elo_fetcher = ELOFetcher(self.config.get("eloRequestConcurrency"))
+        self.oracle_token_counts = {}
+        self.card_keywords = {}
+        self.url_card_names = {}
+        self.card_index = {}
+        self.card_token_oracles = {}
 
     def _set_data_dir(self, data_dir: str) -> None:
         """
@@ -66,14 +71,46 @@ class CohortAnalyzer(PipelineObject):
         """
         Set the cube data from the CSV files crawled from Cube Cobra.
         """
-        cubes = []
-        for cube_file_path in self.data_dir.glob('*.csv'):
-            data = pd.read_csv(cube_file_path)
-            data['Cube ID'] = cube_file_path.stem
-            data['Cube Name'] = self.cube_name_map[cube_file_path.stem]
-            cubes.append(data)
-        self.aggregate_cube_data = pd.concat(cubes)
-        self.aggregate_cube_data.to_csv(self.analysis_dir / "aggregate_cube_data.csv", index=False)
+        cube_file_paths = list(self.data_dir.glob('*.csv'))
+        with ThreadPoolExecutor(max_workers=CSV_READER_MAX_WORKERS) as executor:
+            cubes = list(executor.map(self.load_cube_file, cube_file_paths))
+        self.number_of_sampled_cubes = len(cubes)
+        self.aggregate_cube_data = pd.concat(cubes, ignore_index=True)
+        for column in ['Cube ID', 'Cube Name', 'Type']:
+            self.aggregate_cube_data[column] = self.aggregate_cube_data[column].astype('category')
+        if self.config.get("writeIntermediateFiles", False):
+            self.aggregate_cube_data.to_csv(self.analysis_dir / "aggregate_cube_data.csv", index=False)
+
+        # flag lands once, scanning only the distinct type lines rather than every row
+        card_types = self.aggregate_cube_data['Type'].cat.categories
+        land_types = {card_type for card_type in card_types if 'land' in card_type.lower()}
+        self.aggregate_cube_data['Is Land'] = self.aggregate_cube_data['Type'].isin(land_types)
+        cube_groups = self.aggregate_cube_data.groupby('Cube ID', observed=True, sort=False)
+        self.cube_card_names = cube_groups['name'].agg(list).to_dict()
+        # coerce CMC once for the cube statistics, leaving the raw column for the per-card stats
+        self.numeric_cmc = pd.to_numeric(self.aggregate_cube_data['CMC'].fillna(0), errors='coerce')
+        self._set_unique_card_names()
+
+    def load_cube_file(self, cube_file_path: Path) -> pd.DataFrame:
+        """
+        Load a single cube CSV file and tag its rows with the cube's ID and name.
+
+        :param cube_file_path: path to the cube CSV file.
+        :return: the cube's cards.
+        """
+        data = pd.read_csv(cube_file_path, usecols=self.cube_csv_columns, dtype=self.cube_csv_dtypes)
+        data['Cube ID'] = cube_file_path.stem
+        data['Cube Name'] = self.cube_name_map[cube_file_path.stem]
+
+        return data
+
+    def _set_unique_card_names(self) -> None:
+        """
+        Set the names of the cards that are included in exactly one cube of the cohort, keyed by that cube's ID.
+        """
+        cube_cards = self.aggregate_cube_data[['name', 'Cube ID']].drop_duplicates()
+        unique_cube_cards = cube_cards[~cube_cards['name'].duplicated(keep=False)]
+        self.unique_card_names = unique_cube_cards.groupby('Cube ID', observed=True)['name'].agg(list).to_dict()
 
     async def _set_card_data(self) -> None:
         """
@@ -83,23 +120,27 @@ class CohortAnalyzer(PipelineObject):
             self._set_cube_data()
         cube_data_with_elo_scores = await self.update_elo_scores(self.aggregate_cube_data)
         grouped = cube_data_with_elo_scores.groupby('name').agg({
-            'Cube ID': ['nunique', lambda x: list(x.unique())],
-            'Type': 'first',
+            'Cube ID': 'nunique',
+            'Is Land': 'first',
             'ELO': 'first',
             'CMC': 'first'
         })
         raw_frequency = cube_data_with_elo_scores['name'].value_counts()
-        grouped.columns = ['Cube Frequency', 'Included in Cubes', 'Type', 'ELO', 'CMC']
-        total_cubes = cube_data_with_elo_scores['Cube ID'].nunique()
-        grouped['Card Uniqueness'] = np.log(total_cubes / grouped['Cube Frequency'])
-        grouped['Card Uniqueness'] = min_max_normalize_sklearn(grouped['Card Uniqueness'].values)
-        grouped['Non-Land'] = ~grouped['Type'].str.contains('land', case=False)
+        grouped.columns = ['Cube Frequency', 'Is Land', 'ELO', 'CMC']
+        # list the cube IDs as plain strings, aggregating the categorical column into lists is not supported everywhere
+        cube_ids = cube_data_with_elo_scores['Cube ID'].astype(str)
+        grouped.insert(1, 'Included in Cubes',
+                       cube_ids.groupby(cube_data_with_elo_scores['name']).agg(lambda x: list(x.unique())))
+        grouped['Card Uniqueness'] = np.log(self.number_of_sampled_cubes / grouped['Cube Frequency'])
+        grouped['Card Uniqueness'] = min_max_normalize(grouped['Card Uniqueness'].values)
+        grouped['Non-Land'] = ~grouped['Is Land']
         grouped['Raw Frequency'] = raw_frequency
-        grouped.drop(columns='Type', inplace=True)
+        grouped.drop(columns='Is Land', inplace=True)
         self.card_stats = grouped.sort_values(by=['Cube Frequency', 'ELO'],
                                               ascending=[False, False]).reset_index().rename(
             columns={'index': 'Card Name'})
         self.card_stats.to_csv(self.analysis_dir / "card_stats.csv", index=False)
+        self.card_uniqueness = dict(zip(self.card_stats['name'], self.card_stats['Card Uniqueness']))
 
     async def update_elo_scores(self, freq_frame) -> pd.DataFrame:
         """
@@ -108,24 +149,7 @@ class CohortAnalyzer(PipelineObject):
         :param freq_frame: a DataFrame with card names.
         :return: a DataFrame with ELO scores added.
         """
-
-        async def update_elo_cache(fetcher, cards):
-            tasks = [fetcher.get_card_elo(card) for card in cards if card is not None]
-
-            return await asyncio.gather(*tasks)
-
-        unique_cards = freq_frame.name.unique()
-        await update_elo_cache(self.elo_fetcher, unique_cards)
-        self.elo_fetcher.save_cache()
-
-        elo_scores = []
-        for card in freq_frame.name:
-            if card is None:
-                elo_scores.append(0.0)
-            else:
-                elo = await self.elo_fetcher.get_card_elo(card)
-                elo_scores.append(elo)
-        freq_frame['ELO'] = elo_scores
+        freq_frame['ELO'] = await self.elo_fetcher.map_card_elos(freq_frame['name'])
 
         return freq_frame
 
@@ -133,37 +157,32 @@ class CohortAnalyzer(PipelineObject):
         """
         This is the main method of this class. Analyze the cohort of cubes and write the results to a set of CSV files.
         """
-        logger.info(f"Analyzing {self.get_number_of_cubes_sampled(self.data_dir)} cubes in cohort")
         self._set_cube_data()
+        logger.info(f"Analyzing {self.number_of_sampled_cubes} cubes in cohort")
         await self._set_card_data()
         results = self.combine_cubes()
 
-        for column in ["Keyword Breadth", "Keyword Depth", "Keyword Balance"]:
-            results[column] = min_max_normalize_sklearn(results[column].values)
-
-        results["Oracle Text Normalized Mean Word Count"] = min_max_normalize_sklearn(results["Oracle Text Mean Word Count"].values)
+        normalized_columns = ["Keyword Breadth", "Keyword Depth", "Keyword Balance",
+                              "Oracle Text Normalized Mean Word Count"]
+        source_columns = ["Keyword Breadth", "Keyword Depth", "Keyword Balance", "Oracle Text Mean Word Count"]
+        results[normalized_columns] = min_max_normalize(results[source_columns].to_numpy())
 
         results["Cube Name"] = self.set_cube_name_hyperlinks(results["Cube ID"].values)
-        results["Unique Card Count"] = self.format_unique_cards_column(results)
         results["Cross-Cube Card Overlap"] = self.format_duplicate_cards_column(results)
+        results["Unique Card Count"] = self.format_unique_cards_column(results)
 
-        cube_uniqueness_scores = []
-        unique_card_object_counts = []
-        token_generators = []
-        for cube_id in results['Cube ID']:
-            cube_cards = self.aggregate_cube_data[self.aggregate_cube_data['Cube ID'] == cube_id]['name'].tolist()
-            cube_uniqueness_scores.append(self.calculate_uniqueness_score(cube_cards))
-            unique_oracle_ids, total_token_generators = self.count_unique_tokens_and_emblems(cube_cards)
-            unique_card_object_counts.append(len(unique_oracle_ids))
-            token_generators.append(total_token_generators)
-        results["Cube Uniqueness"] = min_max_normalize_sklearn(cube_uniqueness_scores)
+        cube_card_metrics = [self.calculate_cube_card_metrics(self.cube_card_names[cube_id])
+                             for cube_id in results['Cube ID']]
+        cube_uniqueness_scores, unique_card_object_counts, token_generators = map(np.array, zip(*cube_card_metrics))
+        cube_sizes = results['Cube Size'].to_numpy(dtype=np.float64)
         results["Unique Token Count"] = unique_card_object_counts
-        results["Normalized Unique Tokens"] = min_max_normalize_sklearn([xx/yy for xx, yy in zip(unique_card_object_counts, results['Cube Size'])])
-        results["Normalized Token Generators"] = min_max_normalize_sklearn([xx/yy for xx, yy in zip(token_generators, results['Cube Size'])])
+        results[["Cube Uniqueness", "Normalized Unique Tokens", "Normalized Token Generators"]] = min_max_normalize(
+            np.column_stack([cube_uniqueness_scores, unique_card_object_counts / cube_sizes,
+                             token_generators / cube_sizes]))
         results['Cube Complexity'] = results[
             ['Keyword Breadth', 'Keyword Depth', 'Oracle Text Normalized Mean Word Count', 'Cube Uniqueness',
              'Unique Card Percentage', 'Normalized Unique Tokens', 'Normalized Token Generators']].sum(axis=1)
-        results['Cube Complexity'] = min_max_normalize_sklearn(results['Cube Complexity'].values)
+        results['Cube Complexity'] = min_max_normalize(results['Cube Complexity'].values)
 
         results = results.sort_values(by='Cube Name')
 
@@ -176,115 +195,128 @@ class CohortAnalyzer(PipelineObject):
         results.to_csv(self.analysis_dir / "cube_stats.csv", index=False)
         logger.info(f"Analysis complete, results written to file in analysis directory: file://{self.analysis_dir}")
 
-    @staticmethod
-    def get_number_of_cubes_sampled(directory_path) -> int:
-        return len(list(Path(directory_path).glob('*.csv')))
-
     def combine_cubes(self) -> pd.DataFrame:
-        cube_dicts = {}
-        for cube_file_path in Path(self.data_dir).glob('*.csv'):
-            file_name = cube_file_path.stem
-            cube_dicts[file_name] = self.analyze_cube(cube_file_path)
-        results = pd.DataFrame.from_dict(cube_dicts)
-        results = results.T
-        results = results.reset_index()
-        results.rename(columns={'index': 'Cube ID'}, inplace=True)
+        cube_keyword_counts = self.count_cube_keywords()
+        cube_records = [self.analyze_cube(cube_id, cube, cube_keyword_counts[cube_id])
+                        for cube_id, cube in self.aggregate_cube_data.groupby('Cube ID', observed=True, sort=False)]
 
-        return results
+        return pd.DataFrame.from_records(cube_records)
 
-    def analyze_cube(self, filepath) -> dict:
+    def analyze_cube(self, cube_id: str, cube: pd.DataFrame, keyword_counter: Counter) -> dict:
         """
-        Analyze a cube file and return a dictionary of the results.
+        Analyze the cards of a single cube and return a dictionary of the results.
 
-        :param filepath: Path to the cube file.
+        :param cube_id: a string uniquely identifying the cube.
+        :param cube: the rows of the aggregate cube data belonging to the cube.
+        :param keyword_counter: a counter of the keywords of the cube's cards.
         :return: Dictionary of analysis results.
         """
-        cube_id = filepath.stem
-        keyword_counter = defaultdict(int)
-        cube_data = {}
-        cube = pd.read_csv(filepath)
+        card_names = cube['name'].to_numpy()
+        cube_size = card_names.size
         word_count = 0
-        cube['CMC'] = cube['CMC'].fillna(0)
-        cube['CMC'] = pd.to_numeric(cube['CMC'], errors='coerce')
-        nonland_cards = cube[~cube['Type'].str.contains('land', case=False)]
-        mean_cmc = nonland_cards['CMC'].mean()
-        median_cmc = int(nonland_cards['CMC'].median())
-
-        for index in range(cube.shape[0]):
-            row = cube.iloc[index]
-            cube_data[row["name"]] = self.get_card_data(row["name"], keyword_counter)
+        cmc = self.numeric_cmc.loc[cube.index].to_numpy(dtype=np.float64)
+        nonland_cmc = cmc[~cube['Is Land'].to_numpy()]
+        mean_cmc = np.nanmean(nonland_cmc)
+        median_cmc = int(np.nanmedian(nonland_cmc))
+
+        for card_name in card_names:
             try:
-                word_count += self.oracle_text_token_count(row["name"])
+                word_count += self.oracle_text_token_count(card_name)
             except:
                 continue
 
-        keyword_breadth = len(keyword_counter) / cube.shape[0]
-        keyword_depth = sum(keyword_counter.values()) / cube.shape[0]
+        keyword_breadth = len(keyword_counter) / cube_size
+        keyword_depth = sum(keyword_counter.values()) / cube_size
         keyword_balance = keyword_breadth / keyword_depth
-        most_frequent_keywords = self.get_k_most_frequent(keyword_counter, 3)
-        mean_word_count = word_count / cube.shape[0]
+        most_frequent_keywords = dict(keyword_counter.most_common(3))
+        mean_word_count = word_count / cube_size
 
         unique_card_count, unique_card_names = self.get_unique_card_count_and_card_names(cube_id)
-        unique_card_percentage = unique_card_count / cube.shape[0]
+        unique_card_percentage = unique_card_count / cube_size
 
-        return {"Keyword Breadth": keyword_breadth, "Keyword Depth": keyword_depth, "Keyword Balance": keyword_balance,
-                "Keyword Frequency": dict(keyword_counter), "Defining Keyword Frequency": most_frequent_keywords,
-                "Oracle Text Mean Word Count": mean_word_count, "Cube Size": cube.shape[0],
-                "Unique Card Count": unique_card_count, "Unique Card Percentage": unique_card_percentage,
-                "Unique Card Names": unique_card_names, "Mean CMC": mean_cmc, "Median CMC": median_cmc}
+        return {"Cube ID": cube_id, "Keyword Breadth": keyword_breadth, "Keyword Depth": keyword_depth,
+                "Keyword Balance": keyword_balance, "Keyword Frequency": dict(keyword_counter),
+                "Defining Keyword Frequency": most_frequent_keywords, "Oracle Text Mean Word Count": mean_word_count,
+                "Cube Size": cube_size, "Unique Card Count": unique_card_count,
+                "Unique Card Percentage": unique_card_percentage, "Unique Card Names": unique_card_names,
+                "Mean CMC": mean_cmc, "Median CMC": median_cmc}
 
-    def get_card_data(self, card_name, counter: defaultdict) -> List[str]:
+    def get_scryfall_card(self, card_name: str) -> dict:
         """
-        Get data for a specific card.
+        Get the Scryfall data of a card. Cards that are not cached under their own name are looked up by their extended
+        name instead, e.g. "Giant Killer // Chop Down". Each name is resolved once and kept in the card index.
+
+        :param card_name: the name of the card
+        :return: a dictionary of Scryfall card data, empty if the card could not be found.
+        """
+        if card_name not in self.card_index:
+            card_data = self.elo_fetcher.scryfall_cache.get(card_name)
+            if not card_data:
+                extended_name = self.elo_fetcher.scryfall.get_extended_name(card_name)
+                card_data = self.elo_fetcher.scryfall_cache.get(extended_name)
+            if isinstance(card_data, list):
+                card_data = card_data[0] if card_data else None
+            self.card_index[card_name] = card_data or {}
+
+        return self.card_index[card_name]
+
+    def count_cube_keywords(self) -> defaultdict:
+        """
+        Count the keywords of every cube in the cohort in one grouped pass over all of their cards' keywords. Keywords
+        are looked up once per distinct card name.
+
+        :return: a mapping of cube ID to a counter of that cube's keyword counts.
+        """
+        card_names = self.aggregate_cube_data['name']
+        keywords_by_name = {card_name: self.get_card_data(card_name) for card_name in card_names.unique()}
+        cube_keywords = pd.DataFrame({'Cube ID': self.aggregate_cube_data['Cube ID'],
+                                      'Keyword': card_names.map(keywords_by_name)}).explode('Keyword').dropna()
+
+        cube_keyword_counts = defaultdict(Counter)
+        keyword_counts = cube_keywords.groupby(['Cube ID', 'Keyword'], observed=True, sort=False).size()
+        for (cube_id, keyword), count in keyword_counts.items():
+            cube_keyword_counts[cube_id][keyword] = int(count)
+
+        return cube_keyword_counts
+
+    def get_card_data(self, card_name) -> List[str]:
+        """
+        Get data for a specific card. Evergreen keywords are skipped, becoming the monarch and the Ring tempting you are
+        treated as keywords and triomes have no keywords at all. Keywords are cached by card name.
 
         :param card_name: the name of the card
-        :param counter: a shard counter dictionary to keep track of keyword counts. This parameter's values are updated
-        for future use.
         :return: a list of keywords for the card.
         """
-        try:
-            data = self.elo_fetcher.scryfall_cache.get(card_name, {})[0]
-        except KeyError:
-            # backoff for adventure and DF Cards
-            data = self.elo_fetcher.scryfall_cache.get(card_name, {})
-        keywords = data.get('keywords', [])
-        if card_name not in self.triomes:
-            for keyword in keywords:
-                if keyword not in self.evergreen_keywords:
-                    counter[keyword] += 1
-
-            oracle = data.get('oracle_text', '')
-            for phrase, keyword in [('you become the monarch', 'Monarch'), ('Ring tempts you', 'The Ring tempts you')]:
-                if phrase in oracle:
-                    counter[keyword] += 1
-                    keywords.append(keyword),
+        if card_name in self.card_keywords:
+            return self.card_keywords[card_name]
 
-        return keywords
+        if card_name in self.triomes:
+            keywords = []
+        else:
+            data = self.get_scryfall_card(card_name)
+            keywords = [keyword for keyword in data.get('keywords', []) if keyword not in self.evergreen_keywords]
 
-    @staticmethod
-    def get_k_most_frequent(d, k):
-        # Using heapq.nlargest to get the k keys with the largest values
-        k_keys = heapq.nlargest(k, d, key=d.get)
+            phrases = set(self.keyword_phrase_pattern.findall(data.get('oracle_text', '')))
+            keywords.extend(keyword for phrase, keyword in self.keyword_phrases.items() if phrase in phrases)
 
-        # Creating a new dictionary with these keys and their corresponding values
-        k_most_frequent = {key: d[key] for key in k_keys}
+        self.card_keywords[card_name] = keywords
 
-        return k_most_frequent
+        return keywords
 
     def oracle_text_token_count(self, card_name: str) -> int:
         """
-        Tokenize the oracle text of a card.
+        Count the tokens in the oracle text of a card. Counts are cached by card name since the same cards are shared by
+        many cubes in a cohort.
 
-        :param card_name: Oracle text of a card.
-        :return: List of tokens.
+        :param card_name: the name of the card.
+        :return: the number of tokens in the card's oracle text.
         """
-        try:
-            data = self.elo_fetcher.scryfall_cache.get(card_name, {})[0]
-        except KeyError:
-            # backoff for adventure and DF Cards
-            data = self.elo_fetcher.scryfall_cache.get(card_name, {})
-        oracle_text = data.get('oracle_text', '')
-        return len(word_tokenize(oracle_text))
+        if card_name not in self.oracle_token_counts:
+            data = self.get_scryfall_card(card_name)
+            oracle_text = data.get('oracle_text', '')
+            self.oracle_token_counts[card_name] = len(self.oracle_token_pattern.findall(oracle_text))
+
+        return self.oracle_token_counts[card_name]
 
     def get_unique_card_count_and_card_names(self, cube_id) -> Tuple[int, List[str]]:
         """
@@ -293,37 +325,27 @@ class CohortAnalyzer(PipelineObject):
         :param cube_id: as string uniquely identifying a cube.
         :return: get back a tuple of the number of unique cards and a list of the names of those cards.
         """
-        cube_data_rows = self.aggregate_cube_data[self.aggregate_cube_data['Cube ID'] == cube_id]
-        cube_card_names = set(cube_data_rows['name'])
-        other_cube_card_names = set(self.aggregate_cube_data[self.aggregate_cube_data['Cube ID'] != cube_id]['name'])
-        names_exclusive_to_data = cube_card_names - other_cube_card_names
+        names_exclusive_to_data = self.unique_card_names.get(cube_id, [])
 
-        return len(names_exclusive_to_data), list(names_exclusive_to_data)
+        return len(names_exclusive_to_data), names_exclusive_to_data
 
     def set_cube_name_hyperlinks(self, cube_ids):
-        formatted_names = []
-        for cube_id in cube_ids:
-            formatted_names.append(
-                f'''=HYPERLINK("https://cubecobra.com/cube/overview/{cube_id}", "{self.cube_name_map[cube_id]}")''')
-
-        return formatted_names
+        return [f'''=HYPERLINK("https://cubecobra.com/cube/overview/{cube_id}", "{self.cube_name_map[cube_id]}")'''
+                for cube_id in cube_ids]
 
     def format_unique_cards_column(self, data):
         values = []
-        for row in data.iterrows():
-            id = row[1]['Cube ID']
-            cards = row[1]['Unique Card Names']
-            scryfall_url = self.make_cube_cobra_visual_spoiler_url(id, cards)
-            values.append(f'''=HYPERLINK("{scryfall_url}", "{row[1]["Unique Card Count"]}")''')
+        for cube_id, cards, unique_card_count in zip(data['Cube ID'], data['Unique Card Names'],
+                                                     data['Unique Card Count']):
+            scryfall_url = self.make_cube_cobra_visual_spoiler_url(cube_id, cards)
+            values.append(f'''=HYPERLINK("{scryfall_url}", "{unique_card_count}")''')
         return values
 
     def format_duplicate_cards_column(self, data):
         values = []
-        for row in data.iterrows():
-            cube_id = row[1]['Cube ID']
-            cube_size, _ = self.get_unique_card_count_and_card_names(cube_id)
-            cards = row[1]['Unique Card Names']
-            duplicate_card_count = int(row[1]['Cube Size'] - cube_size)
+        for cube_id, cards, unique_card_count, cube_size in zip(data['Cube ID'], data['Unique Card Names'],
+                                                                data['Unique Card Count'], data['Cube Size']):
+            duplicate_card_count = int(cube_size - unique_card_count)
             scryfall_url = self.make_cube_cobra_visual_spoiler_url(cube_id, cards, exclusion=True)
             values.append(f'''=HYPERLINK("{scryfall_url}", "{duplicate_card_count}")''')
         return values
@@ -340,14 +362,27 @@ class CohortAnalyzer(PipelineObject):
         url_start = f"https://cubecobra.com/cube/list/{cube_id}?f="
         joiner = '%22+or+' if exclusion is False else '%22+and+'
         url_end = "%22&view=spoiler"
-        card_list = joiner.join([self.format_card_name(card_name, exclusion) for card_name in card_list])
+        beginning = "-name%3A%22" if exclusion else "name%3D%22"
+        card_list = joiner.join([beginning + self.format_card_name(card_name) for card_name in card_list])
 
         return url_start + card_list + url_end
 
-    @staticmethod
-    def format_card_name(card_name, exclusion=False):
-        beginning = "-name%3A%22" if exclusion else "name%3D%22"
-        return beginning + card_name.replace(" ", "+")
+    def format_card_name(self, card_name):
+        if card_name not in self.url_card_names:
+            self.url_card_names[card_name] = quote_plus(card_name)
+
+        return self.url_card_names[card_name]
+
+    def calculate_cube_card_metrics(self, cube_cards: List[str]) -> Tuple[float, int, int]:
+        """
+        Calculate the metrics of a cube that depend on the data of its individual cards.
+
+        :param cube_cards: a list of the card names in the cube.
+        :return: get back a tuple of the cube's uniqueness score, unique token count and number of token generators.
+        """
+        unique_oracle_ids, total_token_generators = self.count_unique_tokens_and_emblems(cube_cards)
+
+        return self.calculate_uniqueness_score(cube_cards), len(unique_oracle_ids), total_token_generators
 
     def calculate_uniqueness_score(self, card_names: List[str]) -> float:
         """
@@ -356,10 +391,10 @@ class CohortAnalyzer(PipelineObject):
         :param card_names: a list of string card names
         :return: a float value denoting the uniqueness score of the cube normalized by its size.
         """
-        numerator = self.card_stats[self.card_stats['name'].isin(card_names)]['Card Uniqueness'].sum()
-        denominator = self.card_stats[self.card_stats['name'].isin(card_names)]['Card Uniqueness'].count()
+        uniqueness_scores = [self.card_uniqueness[card_name] for card_name in set(card_names)
+                             if card_name in self.card_uniqueness]
 
-        return numerator / denominator
+        return np.nanmean(uniqueness_scores)
 
     def count_unique_tokens_and_emblems(self, cube_cards: list) -> Tuple[set, int]:
         """
@@ -371,14 +406,26 @@ class CohortAnalyzer(PipelineObject):
         unique_oracles = set()
         total_token_generators = 0
         for card_name in cube_cards:
-            card_data = self._get_card_data(card_name)
-            if card_data:
-                card_oracles, _ = self._process_card_parts(card_data)
-                total_token_generators += len(card_oracles)
-                unique_oracles.update(card_oracles)
+            card_oracles = self.get_card_token_oracles(card_name)
+            total_token_generators += len(card_oracles)
+            unique_oracles.update(card_oracles)
 
         return unique_oracles, total_token_generators
 
+    def get_card_token_oracles(self, card_name: str) -> frozenset:
+        """
+        Get the oracle IDs of the tokens, emblems and dungeons a card makes. Oracle IDs are cached by card name.
+
+        :param card_name: the name of the card.
+        :return: a frozenset of oracle IDs.
+        """
+        if card_name not in self.card_token_oracles:
+            card_data = self._get_card_data(card_name)
+            card_oracles = self._process_card_parts(card_data)[0] if card_data else ()
+            self.card_token_oracles[card_name] = frozenset(card_oracles)
+
+        return self.card_token_oracles[card_name]
+
     def _get_card_data(self, card_name: str) -> Union[dict, None]:
         """
         Get card data from Scryfall. Get a card object based on the card name, or the extended name if it cannot be
@@ -387,12 +434,7 @@ class CohortAnalyzer(PipelineObject):
         :param card_name: The name of the card data
         :return:
         """
-        card_data = self.elo_fetcher.scryfall_cache.get(card_name)
-        if card_data is None or not card_data:
-            extended_name = self.elo_fetcher.get_extended_name(card_name)
-            card_data = self.elo_fetcher.scryfall_cache.get(extended_name)
-
-        return card_data[0] if card_data and len(card_data) > 0 else None
+        return self.get_scryfall_card(card_name) or None
 
     def _process_card_parts(self, card_data: dict) -> Tuple[set, set]:
         """
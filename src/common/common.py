@@ -1,10 +1,11 @@
 import aiohttp
-import dill
+import numpy as np
+import os
+import pickle
 
 from datetime import datetime, timezone
 from loguru import logger
 from pathlib import Path
-from sklearn.preprocessing import MinMaxScaler
 
 
 async def async_fetch_data(url: str) -> str:
@@ -13,17 +14,22 @@ async def async_fetch_data(url: str) -> str:
             return await response.text()
 
 
-def to_pickle(data, path: str, protocol: int = 3) -> None:
+async def async_fetch_bytes(url: str, session: aiohttp.ClientSession) -> bytes:
+    async with session.get(url) as response:
+        return await response.read()
+
+
+def to_pickle(data, path: str, protocol: int = pickle.HIGHEST_PROTOCOL) -> None:
     """
     pickle data to a file
 
     :param data: data to pickle
     :param path: path to write data to
-    :param protocol: pickle protocol level to be used (python's current default is 3)
+    :param protocol: pickle protocol level to be used (defaults to the highest protocol available)
     """
 
     with open(path, 'wb') as file:
-        dill.dump(data, file, protocol=protocol)
+        pickle.dump(data, file, protocol=protocol)
 
 
 def from_pickle(path: str):
@@ -35,7 +41,7 @@ def from_pickle(path: str):
     """
 
     with open(path, 'rb') as file:
-        return dill.load(file)
+        return pickle.load(file)
 
 
 def ensure_dir_exists(path):
@@ -57,6 +63,17 @@ def ensure_dir_exists(path):
     return path_obj.absolute()
 
 
+def count_csv_files(directory_path) -> int:
+    """
+    Count the CSV files in a directory without materializing the directory listing.
+
+    :param directory_path: path of the directory to scan (string or Path object)
+    :return: number of CSV files in the directory
+    """
+    with os.scandir(directory_path) as entries:
+        return sum(1 for entry in entries if entry.name.endswith('.csv') and entry.is_file())
+
+
 def get_utc_time() -> str:
     """
     Get the current UTC time in the format YYYYMMDD HHMMSS
@@ -65,17 +82,19 @@ def get_utc_time() -> str:
     return now_utc.strftime('%Y-%m-%d %H:%M:%S')
 
 
-def min_max_normalize_sklearn(values):
-    # Reshape the input list to a 2D array
-    values_array = [[x] for x in values]
-
-    # Create an instance of MinMaxScaler
-    scaler = MinMaxScaler()
+def min_max_normalize(values) -> np.ndarray:
+    """
+    Scale values to the [0, 1] range, matching sklearn's MinMaxScaler. NaNs are ignored when finding the range and kept
+    in the output, and constant values are all scaled to 0. The columns of a 2-D input are each scaled on their own.
 
-    # Fit and transform the data
-    normalized_values = scaler.fit_transform(values_array)
+    :param values: 1-D sequence of numbers, or 2-D array of columns, to normalize
+    :return: normalized values as a float array
+    """
+    values_array = np.asarray(values, dtype=np.float64)
+    if np.isinf(values_array).any():
+        raise ValueError("Input contains infinity, values cannot be min-max normalized")
 
-    # Flatten the normalized values to a 1D list
-    normalized_values = normalized_values.flatten()
+    minimum = np.nanmin(values_array, axis=0)
+    value_range = np.nanmax(values_array, axis=0) - minimum
 
-    return normalized_values
+    return (values_array - minimum) / np.where(value_range == 0, 1.0, value_range)
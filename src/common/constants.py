@@ -14,6 +14,9 @@ COHORT_ANALYSIS_DIRECTORY_PATH = ensure_dir_exists(ARTIFACTS_DIRECTORY / "cohort
 RESULTS_DIRECTORY_PATH = ensure_dir_exists(ARTIFACTS_DIRECTORY / "results")
 EXAMPLE_CONFIGS_DIRECTORY_PATH = PARENT_DIRECTORY / "src" / "cube_config" / "example_configs"
 
+# reading cube CSVs is mostly waiting on disk, so allow more threads than cores
+CSV_READER_MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
 COLORS_SET = {"White", "Blue", "Black", "Red", "Green", "Multicolored", "Colorless", "Land"}
 CARD_COLOR_MAP = {
     "w": "White",
@@ -63,10 +66,11 @@ AWS_SECRET_ACCESS_KEY = os.environ.get("CUBE_COBRA_AWS_SECRET_ACCESS_KEY")
 
 BLACKLIST_REGEX = r"""\b(white|black|blue|red|green|esper|grixis|naya|jund|bant|jeskai|temur|mardu|sultai|abzan|old school|oldschool|93|94|border|alpha|beta|antiquities|legends|pre.*modern|mono|frame|nostalgia|\sabu\s|data generated|pre[\b-]|connect the clues)\b"""
 
-EVERGREEN_KEYWORDS = {
+EVERGREEN_KEYWORDS = frozenset({
     "Activate", "Attach", "Cast", "Counter", "Create", "Deathtouch", "Defender", "Destroy", "Discard",
     "Double strike", "Enchant", "Equip", "Exchange", "Exile", "Fight", "First strike", "Flash", "Flying", "Haste",
     "Hexproof", "Indestructible", "Lifelink", "Menace", "Mill", "Play", "Protection", "Reach", "Reveal",
-    "Sacrifice", "Scry", "Search", "Shuffle", "Tap/Untap", "Trample", "Vigilance", "Ward"}
-TRIOMES = {"Savai Triome", "Indatha Triome", "Ketria Triome", "Raugrin Triome", "Zagoth Triome", "Raffine's Tower",
-           "Spara's Headquarters", "Xander's Lounge", "Jetmir's Garden", "Ziatora's Proving Ground"}
\ No newline at end of file
+    "Sacrifice", "Scry", "Search", "Shuffle", "Tap/Untap", "Trample", "Vigilance", "Ward"})
+TRIOMES = frozenset({"Savai Triome", "Indatha Triome", "Ketria Triome", "Raugrin Triome", "Zagoth Triome",
+                     "Raffine's Tower", "Spara's Headquarters", "Xander's Lounge", "Jetmir's Garden",
+                     "Ziatora's Proving Ground"})
\ No newline at end of file
@@ -6,14 +6,13 @@ from typing import List, Tuple, Union
 
 import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker
-import numpy as np
 import pandas as pd
 import seaborn as sns
 from loguru import logger
 from matplotlib.colors import to_rgb
 from matplotlib.lines import Line2D
 from src.common.args import process_args
-from src.common.common import ensure_dir_exists, min_max_normalize_sklearn
+from src.common.common import ensure_dir_exists, min_max_normalize
 from src.common.constants import ANALYSIS_DIRECTORY_PATH, COLOR_PALETTE, RESULTS_DIRECTORY_PATH, TYPE_PALETTE
 from src.cube_config.cube_configuration import CubeConfig
 from src.pipeline_object.pipeline_object import PipelineObject
@@ -54,38 +53,34 @@ class CubeAnalyzer(PipelineObject):
         Sets the data dictionary to analyze data over. The cube is pulled from a previously generated csv file.
         :return:
         """
-        cube_file_path = str(RESULTS_DIRECTORY_PATH / self.config.cubeName) + ".csv"
+        cube_file_path = str(RESULTS_DIRECTORY_PATH / f"{self.config.cubeName}.csv")
         data = self.load_cube(cube_file_path)
         data['Card Type'] = data.apply(self.clean_types, axis=1)
 
         filtered_data = data[data["ELO"] < 1750]
-        filtered_data.reset_index(inplace=True, drop=True)
         mean, stdev = filtered_data['ELO'].mean(), filtered_data['ELO'].std()
         two_stdev = mean + stdev * 2
         filtered_data = filtered_data[filtered_data['ELO'] <= two_stdev]
-        filtered_data.reset_index(inplace=True, drop=True)
 
-        outliers = data[data['ELO'] > two_stdev]
-        outliers = outliers.sort_values('ELO', ascending=False)
-        outliers.reset_index(inplace=True, drop=True)
+        outliers = data[data['ELO'] > two_stdev].sort_values('ELO', ascending=False)
 
         for frame in [data, filtered_data, outliers]:
             for new_col, norm_col in [('Normalized ELO', 'ELO'), ('Normalized Inclusion Rate', 'Inclusion Rate')]:
-                frame[new_col] = min_max_normalize_sklearn(frame[norm_col])
-            frame['Inclusion Rate ELO Diff'] = frame.apply(self.get_elo_coverage_diff, axis=1)
+                frame[new_col] = min_max_normalize(frame[norm_col])
+            frame['Inclusion Rate ELO Diff'] = self.get_elo_coverage_diff(frame)
 
         self.data = {'data': data, 'filtered': filtered_data, 'outliers': outliers}
 
     @staticmethod
-    def get_elo_coverage_diff(row: pd.Series) -> float:
+    def get_elo_coverage_diff(frame: pd.DataFrame) -> pd.Series:
         """
         Gets the difference between the normalized inclusion rate and the normalized ELO - this was also calculated
         at the time the cube csv file was created. We re-calculate this metric here as it is run over various subsets
         of the cube data.
 
-        :param row: a pd.Series object.
+        :param frame: a pd.DataFrame object with normalized inclusion rate and ELO columns.
         """
-        return np.abs(row['Normalized Inclusion Rate'] - row['Normalized ELO'])
+        return (frame['Normalized Inclusion Rate'] - frame['Normalized ELO']).abs()
 
     @staticmethod
     def load_cube(cube_file_path: str) -> pd.DataFrame:
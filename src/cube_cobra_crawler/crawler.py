@@ -14,7 +14,7 @@ from typing import Union
 from src.common.args import process_args
 from src.common.common import ensure_dir_exists
 from src.common.constants import DATA_DIRECTORY_PATH, AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, BLACKLIST_REGEX,\
-    COHORT_ANALYSIS_DIRECTORY_PATH
+    COHORT_ANALYSIS_DIRECTORY_PATH, CUBE_CREATION_RESOURCES_DIRECTORY
 from src.cube_cobra_crawler.csv_file_generator import CSVFileGenerator
 from src.cube_cobra_crawler.rss_feed_crawler import RSSFeedParser
 from src.cube_config.cube_configuration import CubeConfig
@@ -97,7 +97,7 @@ class CubeCobraScraper(PipelineObject):
         self.config.cubeIds = list(set(self.config.cubeIds + bucket_ids))
 
     def fetch_cube_ids(self):
-        download_path = str(Path(__file__).parent.parent / "data_generated_cube" / "data" / "aws_bucket_data.json")
+        download_path = str(CUBE_CREATION_RESOURCES_DIRECTORY / "aws_bucket_data.json")
         self.download_file(bucket_name="cubecobra", object_key="cubes.json", download_path=download_path)
 
         with open(download_path) as fstream:
@@ -153,7 +153,7 @@ class CubeCobraScraper(PipelineObject):
         return ids
 
     def create_oracle_id_mapping(self) -> dict:
-        download_path = str(Path(__file__).parent.parent / "data_generated_cube" / "data" / "indexToOracleMap.json")
+        download_path = str(CUBE_CREATION_RESOURCES_DIRECTORY / "indexToOracleMap.json")
         self.download_file(bucket_name="cubecobra", object_key="indexToOracleMap.json", download_path=download_path)
         with open(download_path) as fstream:
             mapping = json.load(fstream)
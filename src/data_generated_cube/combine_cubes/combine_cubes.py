@@ -1,25 +1,30 @@
-import asyncio
-import os
 import json
 import pandas as pd
 
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
 from loguru import logger
 from pathlib import Path
 
-from src.common.common import min_max_normalize_sklearn
-from src.common.constants import CARD_COLOR_MAP, CUBE_CREATION_RESOURCES_DIRECTORY
+from src.common.common import count_csv_files, min_max_normalize
+from src.common.constants import CARD_COLOR_MAP, COLORS_SET, CSV_READER_MAX_WORKERS, CUBE_CREATION_RESOURCES_DIRECTORY
 from src.data_generated_cube.elo.elo_fetcher import ELOFetcher
 
 
 class CubeCombiner:
     manual_card_color_mapping = pd.read_csv(CUBE_CREATION_RESOURCES_DIRECTORY / 'manually_mapped_color_cards.csv')
+    manual_card_color_map = dict(zip(manual_card_color_mapping['Name'], manual_card_color_mapping['Color Category']))
+    cube_csv_columns = ['name', 'CMC', 'Type', 'Color Category', 'Set', 'Collector Number', 'Rarity', 'maybeboard']
+    cube_csv_dtypes = {'name': str, 'Type': str, 'Color Category': str, 'Set': str,
+                       'Collector Number': str, 'Rarity': str, 'maybeboard': bool}
 
-    def __init__(self, data_dir):
+    def __init__(self, data_dir, max_concurrent_elo_requests=None):
         self.data_dir = data_dir
-        self.elo_fetcher = ELOFetcher()
+        self.elo_fetcher = ELOFetcher(max_concurrent_elo_requests)
         self.cube_weights = self.load_cube_weights()
+        self.number_of_sampled_cubes = self.get_number_of_cubes_sampled(self.data_dir)
 
     def load_cube_weights(self):
         with open(self.data_dir / 'cube_weights.json', 'r') as f:
@@ -32,15 +37,15 @@ class CubeCombiner:
         :return: Combined DataFrame.
 
         """
-        chunks = []
-        for cube_file_path in Path(self.data_dir).glob('*.csv'):
-            chunk = self.process_cube_file(cube_file_path)
-            if chunk is not None:
-                chunks.append(chunk)
+        cube_file_paths = list(Path(self.data_dir).glob('*.csv'))
+        with ThreadPoolExecutor(max_workers=CSV_READER_MAX_WORKERS) as executor:
+            chunks = [chunk for chunk in executor.map(self.process_cube_file, cube_file_paths) if chunk is not None]
 
         if chunks:
             logger.info(f"Sampling {len(chunks)} cubes...")
             concatted_frame = pd.concat(chunks, ignore_index=True)
+            concatted_frame['Color Category'] = pd.Categorical(concatted_frame['Color Category'],
+                                                               categories=sorted(COLORS_SET))
         else:
             logger.debug("No cubes found in the specified directory...", directory=self.data_dir)
             concatted_frame = pd.DataFrame()
@@ -52,11 +57,11 @@ class CubeCombiner:
     def process_cube_file(self, file_path: str) -> pd.DataFrame:
         try:
 
-            chunk = pd.read_csv(file_path)
+            chunk = pd.read_csv(file_path, usecols=self.cube_csv_columns, dtype=self.cube_csv_dtypes)
             chunk = self.remove_maybeboard_cards(chunk)
             chunk = self.manually_map_card_colors(chunk)
 
-            cube_id = os.path.basename(file_path).replace('.csv', '')
+            cube_id = Path(file_path).stem
             cube_weight = self.cube_weights.get(cube_id, 1)
             chunk['Cube Weight'] = cube_weight
 
@@ -65,17 +70,14 @@ class CubeCombiner:
             return chunk
 
         except pd.errors.EmptyDataError:
-            raise ValueError(f"Empty cube: {os.path.basename(file_path)}")
+            raise ValueError(f"Empty cube: {Path(file_path).name}")
 
         except pd.errors.ParserError:
-            raise ValueError(f"Error parsing cube: {os.path.basename(file_path)}")
+            raise ValueError(f"Error parsing cube: {Path(file_path).name}")
 
     @staticmethod
     def remove_maybeboard_cards(frame: pd.DataFrame) -> pd.DataFrame:
-        filtered_frame = frame[~frame['maybeboard']]
-        filtered_frame.reset_index(inplace=True, drop=True)
-
-        return filtered_frame
+        return frame.loc[~frame['maybeboard']].copy()
 
     def manually_map_card_colors(self, frame: pd.DataFrame) -> pd.DataFrame:
         """
@@ -84,38 +86,29 @@ class CubeCombiner:
         :param frame: Input DataFrame containing card data.
         :return: DataFrame with mapped card colors.
         """
-        merged_frame = frame.merge(self.manual_card_color_mapping[['Name', 'Color Category']], left_on='name',
-                                   right_on='Name', how='left')
-        merged_frame['Color Category'] = merged_frame['Color Category_y'].fillna(merged_frame['Color Category_x'])
-        merged_frame.drop(columns=['Color Category_x', 'Color Category_y'], inplace=True)
+        mapped_colors = frame['name'].map(self.manual_card_color_map)
+        frame['Color Category'] = mapped_colors.fillna(frame['Color Category'])
 
-        merged_frame.drop(columns=['Name'], inplace=True)
+        self.clean_color_category_strings(frame)
 
-        self.clean_color_category_strings(merged_frame)
-
-        return merged_frame
+        return frame
 
     def clean_color_category_strings(self, dataframe: pd.DataFrame) -> None:
         """
         Cleans the color category strings in the DataFrame.
         """
-        dataframe['Color Category'] = dataframe['Color Category'].apply(
-            lambda x: ('m' if x == 'Multicolored' else ('l' if x == 'Lands' else x)))
-        dataframe['Color Category'] = dataframe['Color Category'].apply(self.map_color_name)
-
-    @staticmethod
-    def map_color_name(color_string: str) -> str:
-        try:
+        cleaned_colors = dataframe['Color Category'].map(CARD_COLOR_MAP)
+        unmapped_colors = dataframe.loc[cleaned_colors.isna(), 'Color Category']
+        if not unmapped_colors.empty:
 
-            return CARD_COLOR_MAP[color_string]
+            raise KeyError(f"Missing a key {unmapped_colors.iloc[0]}")
 
-        except KeyError as err:
-
-            raise KeyError(f"Missing a key {color_string}: {err}")
+        dataframe['Color Category'] = cleaned_colors
 
     async def get_new_columns(self, data: pd.DataFrame) -> pd.DataFrame:
         """
-        Adds new columns to the DataFrame. The only required column in the data is 'name'.
+        Adds new columns to the DataFrame. The only required column in the data is 'name'. Frequency and Card Weight
+        are aggregated over every sampled row, after which the frame is reduced to one row per card.
 
         * Frequency
         * Inclusion Rate
@@ -128,18 +121,17 @@ class CubeCombiner:
         * Weighted Rank
         """
         data = self.calculate_frequency(data)
+        data = self.calculate_card_weight(data)
+        data = data.drop_duplicates(subset=['name'], ignore_index=True).copy()
         data = self.calculate_inclusion_rate(data)
         data = await self.update_elo_scores(data)
-        data = self.calculate_card_weight(data)
         data['Log ELO'] = data['ELO'].apply(np.log)
         data['Log Inclusion Rate'] = data['Inclusion Rate'].apply(np.log)
         for new_col, norm_col in [('Normalized ELO', 'ELO'), ('Normalized Inclusion Rate', 'Inclusion Rate')]:
-            data[new_col] = min_max_normalize_sklearn(data[norm_col])
-        data['Inclusion Rate ELO Diff'] = data.apply(self.get_elo_coverage_diff, axis=1)
+            data[new_col] = min_max_normalize(data[norm_col])
+        data['Inclusion Rate ELO Diff'] = np.abs(data['Normalized Inclusion Rate'] - data['Normalized ELO'])
         data['Weighted Rank'] = data['Log ELO'] * data['Card Weight']
-        data['Weighted Rank'] = min_max_normalize_sklearn(data['Weighted Rank'])
-
-        data = data.drop_duplicates(subset=['name'])
+        data['Weighted Rank'] = min_max_normalize(data['Weighted Rank'])
 
         return data
 
@@ -148,7 +140,8 @@ class CubeCombiner:
         """
         Calculates the frequency of each card in the DataFrame.
         """
-        frequency_dataframe['Frequency'] = frequency_dataframe.groupby('name')['name'].transform('size')
+        card_counts = frequency_dataframe['name'].value_counts()
+        frequency_dataframe['Frequency'] = frequency_dataframe['name'].map(card_counts)
 
         return frequency_dataframe
 
@@ -156,36 +149,17 @@ class CubeCombiner:
         """
         Calculates the inclusion rate of each card in the DataFrame.
         """
-        number_of_sampled_cubes = self.get_number_of_cubes_sampled(self.data_dir)
-        frequency_dataframe['Inclusion Rate'] = frequency_dataframe['Frequency'] / number_of_sampled_cubes
-        frequency_dataframe['Inclusion Rate'] = frequency_dataframe['Inclusion Rate'].round(4)
+        frequency_dataframe['Inclusion Rate'] = (frequency_dataframe['Frequency'] /
+                                                 self.number_of_sampled_cubes).round(4)
 
         return frequency_dataframe
 
     @staticmethod
     def get_number_of_cubes_sampled(directory_path) -> int:
-        return len(list(Path(directory_path).glob('*.csv')))
-
-    async def update_elo_scores(self, freq_frame) -> None:
-
-        async def update_elo_cache(fetcher, cards):
-            tasks = [fetcher.get_card_elo(card) for card in cards if card is not None]
+        return count_csv_files(directory_path)
 
-            return await asyncio.gather(*tasks)
-
-        unique_cards = freq_frame.name.unique()
-        logger.info(f'Updating ELO scores for {len(unique_cards)} unique cards...')
-        await update_elo_cache(self.elo_fetcher, unique_cards)
-        self.elo_fetcher.save_cache()
-        elo_scores = []
-        for card in freq_frame.name:
-            if card is None:
-                elo_scores.append(0.0)
-            else:
-                elo = await self.elo_fetcher.get_card_elo(card)
-                elo_scores.append(elo)
-
-        freq_frame['ELO'] = elo_scores
+    async def update_elo_scores(self, freq_frame) -> pd.DataFrame:
+        freq_frame['ELO'] = await self.elo_fetcher.map_card_elos(freq_frame['name'])
 
         return freq_frame
 
@@ -194,16 +168,10 @@ class CubeCombiner:
         """
         Calculates the card weight based on the weight of the cubes in which it appears.
         """
-        card_weight_series = data.groupby('name')['Cube Weight'].sum()
-        data = data.merge(card_weight_series.rename('Card Weight'), left_on='name', right_index=True)
-        data['Card Weight'] = np.log(data['Card Weight'])
+        data['Card Weight'] = np.log(data.groupby('name')['Cube Weight'].transform('sum'))
 
         return data
 
-    @staticmethod
-    def get_elo_coverage_diff(row):
-        return np.abs(row['Normalized Inclusion Rate'] - row['Normalized ELO'])
-
     def update_blacklist_for_foils(self, data: pd.DataFrame, blacklist: list) -> list:
         """
         Update the card blacklist to exclude foils from the cube.
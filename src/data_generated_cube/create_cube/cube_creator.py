@@ -1,20 +1,22 @@
 import pandas as pd
 
-from collections import defaultdict
 from loguru import logger
 from pathlib import Path
 from typing import Union
 
-from src.common.constants import CARD_COLOR_MAP, COLORS_SET,  RESULTS_DIRECTORY_PATH
+from src.common.common import count_csv_files
+from src.common.constants import COLORS_SET, RESULTS_DIRECTORY_PATH
 
 
 class CubeCreator:
+    rank_columns = ['Weighted Rank', 'Inclusion Rate', 'ELO']
 
     def __init__(self, card_count: int, data_directory: str, card_blacklist: Union[None, list] = None):
         self.card_count = card_count
         self.data_dir = data_directory
-        self.card_blacklist = card_blacklist
+        self.card_blacklist = frozenset(card_blacklist or ())
         self.card_count_dict = {}
+        self.number_of_sampled_cubes = self.get_number_of_cubes_sampled(data_directory)
 
     def make_cube(self, frame: pd.DataFrame) -> pd.DataFrame:
         """
@@ -25,13 +27,12 @@ class CubeCreator:
 
         :return:
         """
-        card_counts = self._set_color_counts(frame, self.data_dir)
+        card_counts = self._set_color_counts(frame)
         blacklist_updated_frame = self.remove_blacklist_cards(frame)
-        color_frames = self.make_colors_dict(blacklist_updated_frame, self.data_dir)
+        color_frames = self.make_colors_dict(blacklist_updated_frame, card_counts)
 
-        combined_frame = pd.concat([color_frames[xx][:card_counts[xx]] for xx in color_frames])
-        combined_frame = self.sort_and_reset_dataframe_index(combined_frame)
-        combined_frame = combined_frame[:self.card_count]
+        combined_frame = pd.concat(color_frames.values())
+        combined_frame = self.sort_by_rank(combined_frame).head(self.card_count).reset_index(drop=True)
 
         combined_frame.drop(columns=['Cube Weight'], inplace=True)
 
@@ -42,16 +43,17 @@ class CubeCreator:
 
         return combined_frame
 
-    def _set_color_counts(self, frame, directory) -> dict:
+    def _set_color_counts(self, frame) -> dict:
         """
 
         :return:
         """
         logger.info("Calculating color card counts...")
-        number_of_sampled_cubes = self.get_number_of_cubes_sampled(directory)
+        color_frequencies = frame.groupby('Color Category', observed=True)['Frequency'].sum()
         color_counts = {}
         for color in list(COLORS_SET):
-            color_counts[color] = self.get_normalized_card_count(color, frame, number_of_sampled_cubes)
+            color_counts[color] = self.get_normalized_card_count(color_frequencies.get(color, 0),
+                                                                 self.number_of_sampled_cubes)
 
         color_counts = self.adjust_color_counts(color_counts)
 
@@ -61,21 +63,18 @@ class CubeCreator:
 
     @staticmethod
     def get_number_of_cubes_sampled(directory_path) -> int:
-        return len(list(Path(directory_path).glob('*.csv')))
+        return count_csv_files(directory_path)
 
-    def get_normalized_card_count(self, color: str, frame: pd.DataFrame, number_of_sampled_cubes: int) -> int:
+    def get_normalized_card_count(self, color_frequency: int, number_of_sampled_cubes: int) -> int:
         """
         Get the number of cards of a given color to include in the cube. This is done by taking the average number of
         cards of a given color in a cube and normalizing it to the total number of cards in the cube.
 
-        :param color:
-        :param frame:
+        :param color_frequency: summed card frequency of the color across all sampled cubes.
         :param number_of_sampled_cubes:
         :return:
         """
-        color_subset_frame = frame[frame['Color Category'] == color]
-        color_subset_frame.reset_index(inplace=True, drop=True)
-        average_cards_in_cube_per_color = int(color_subset_frame.Frequency.sum() / number_of_sampled_cubes)
+        average_cards_in_cube_per_color = int(color_frequency / number_of_sampled_cubes)
         normalized_percent = average_cards_in_cube_per_color / self.card_count
         normalized_card_count = int(normalized_percent * self.card_count)
 
@@ -108,52 +107,39 @@ class CubeCreator:
             return frame
 
         logger.info(f"Removing blacklisted cards...")
-        filtered_frame = frame[~frame.name.isin(self.card_blacklist)]
-        filtered_frame.reset_index(inplace=True, drop=True)
-
-        return filtered_frame
+        return frame[~frame.name.isin(self.card_blacklist)]
 
-    def make_colors_dict(self, frame: pd.DataFrame, path: str) -> dict:
+    def make_colors_dict(self, frame: pd.DataFrame, card_counts: dict) -> dict:
         """
         Makes a dictionary of DataFrames for each color.
 
         :param frame: Input DataFrame containing card data.
-        :param path: Directory of the cube.
+        :param card_counts: Number of cards to include in the cube for each color.
         :return: Dictionary of DataFrames for each color.
         """
+        color_groups = dict(tuple(frame.groupby('Color Category', observed=True)))
         color_dict = {}
         for color in list(COLORS_SET):
-            color_dict[color] = self.make_color_frame(color, frame)
+            color_dict[color] = self.make_color_frame(color_groups.get(color, frame.iloc[0:0]), card_counts[color])
 
         return color_dict
 
-    def make_color_frame(self, color: str, frame) -> pd.DataFrame:
+    def make_color_frame(self, color_frame: pd.DataFrame, card_count: int) -> pd.DataFrame:
         """
 
-        :param color:
-        :param frame:
-        :return:
+        :param color_frame: the rows of a single color category.
+        :param card_count: the number of cards of the color to include in the cube.
+        :return: the highest ranked cards of the color.
         """
-        freq_frame = frame[frame['Color Category'] == color]
-        freq_frame = self.sort_and_reset_dataframe_index(freq_frame)
+        freq_frame = self.sort_by_rank(color_frame).head(card_count)
 
         return freq_frame
 
-    @staticmethod
-    def count_card_frequencies(frame, color):
-        card_counter = defaultdict(int)
-
-        color_subset_frame = frame[frame['Color Category'].isin([CARD_COLOR_MAP[color]])]
-        color_subset_frame.reset_index(inplace=True, drop=True)
-        for card_name in color_subset_frame.name:
-            card_counter[card_name] += 1
-
-        return card_counter
-
-    @staticmethod
-    def sort_and_reset_dataframe_index(card_frequency_dataframe):
-        card_frequency_dataframe = card_frequency_dataframe.sort_values(['Weighted Rank', 'Inclusion Rate', 'ELO'],
-                                                                        ascending=[False, False, False])
-        card_frequency_dataframe.reset_index(inplace=True, drop=True)
+    def sort_by_rank(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Sort cards from highest to lowest rank. Cards with a NaN rank, e.g. from an ELO of -1.0, are always sorted last.
 
-        return card_frequency_dataframe
+        :param frame: the cards to sort.
+        :return: the sorted cards.
+        """
+        return frame.sort_values(self.rank_columns, ascending=False, na_position='last')
@@ -39,7 +39,7 @@ class CubeGenerator(PipelineObject):
         if "create" not in self.config.stages:
             generated_cube = self.load_existing_cube()
         else:
-            cube_combiner_instance = CubeCombiner(self.data_dir)
+            cube_combiner_instance = CubeCombiner(self.data_dir, self.config.get("eloRequestConcurrency"))
             frames = await cube_combiner_instance.combine_cubes_from_directory()
             self.update_card_blacklist(frames)
 
@@ -57,7 +57,7 @@ class CubeGenerator(PipelineObject):
         :return:
         """
         try:
-            generated_cube = pd.read_csv(str(RESULTS_DIRECTORY_PATH / self.config.cubeName) + ".csv")
+            generated_cube = pd.read_csv(RESULTS_DIRECTORY_PATH / f"{self.config.cubeName}.csv")
             logger.info("Skipping create cube stage")
 
             return generated_cube
@@ -1,12 +1,14 @@
+import aiohttp
 import asyncio
 import re
+import pandas as pd
 from typing import Union
 from datetime import datetime
 from pathlib import Path
 
 from loguru import logger
 
-from src.common.common import async_fetch_data, from_pickle, to_pickle
+from src.common.common import async_fetch_bytes, from_pickle, to_pickle
 from src.common.constants import CUBE_CREATION_RESOURCES_DIRECTORY
 from src.data_generated_cube.scryfall.scryfall_cache import shared_scryfall_cache
 
@@ -14,14 +16,15 @@ from src.data_generated_cube.scryfall.scryfall_cache import shared_scryfall_cach
 class ELOFetcher:
     data_dir = CUBE_CREATION_RESOURCES_DIRECTORY
     cache_file_path = Path(data_dir) / 'elo_cache.pickle'
-    elo_pattern = re.compile(r'"elo".{0,10}')
-    elo_digit_pattern = re.compile(r"\d+.\d+")
+    elo_pattern = re.compile(rb'"elo"\D{0,10}(\d+(?:\.\d+)?)')
+    max_concurrent_requests = 5
     scryfall = shared_scryfall_cache
     scryfall_cache = scryfall.cache
 
-    def __init__(self):
+    def __init__(self, max_concurrent_requests: Union[None, int] = None):
         self.elo_cache = self.load_cache()
         self.lock = asyncio.Lock()
+        self.request_semaphore = asyncio.Semaphore(max_concurrent_requests or self.max_concurrent_requests)
 
     def load_cache(self) -> dict:
         return from_pickle(self.cache_file_path)
@@ -29,27 +32,88 @@ class ELOFetcher:
     def save_cache(self) -> None:
         to_pickle(self.elo_cache, self.cache_file_path)
 
-    async def get_card_elo(self, card_name: str) -> float:
+    async def get_card_elos(self, card_names: list) -> list:
+        """
+        Get the ELO scores for many cards. Fresh cache hits are read directly, while the remaining cards are fetched
+        concurrently. Every Cube Cobra request made while fetching them shares a single HTTP session, so connections
+        are reused instead of being opened per card.
+
+        :param card_names: names of the cards to get ELO scores for.
+        :return: ELO scores in the same order as the card names.
+        """
+        elo_scores = [self.get_cached_elo(card_name) for card_name in card_names]
+        missing_indexes = [index for index, elo_score in enumerate(elo_scores) if elo_score is None]
+        if not missing_indexes:
+
+            return elo_scores
+
+        async with aiohttp.ClientSession() as session:
+            fetched_scores = await asyncio.gather(*[self.get_card_elo(card_names[index], session)
+                                                    for index in missing_indexes])
+
+        for index, elo_score in zip(missing_indexes, fetched_scores):
+            elo_scores[index] = elo_score
+
+        return elo_scores
+
+    async def map_card_elos(self, card_names: pd.Series) -> pd.Series:
+        """
+        Get the ELO scores for a column of card names. Each distinct card is looked up once and the cache is saved
+        afterwards. Cards whose ELO could not be fetched keep a NaN score, while rows without a card name are scored 0.0.
+
+        :param card_names: a Series of card names.
+        :return: a Series of ELO scores aligned with the card names.
+        """
+        unique_cards = card_names.dropna().unique().tolist()
+        logger.info(f'Updating ELO scores for {len(unique_cards)} unique cards...')
+        elo_scores = await self.get_card_elos(unique_cards)
+        self.save_cache()
+
+        card_elo_scores = card_names.map(dict(zip(unique_cards, elo_scores))).astype(float)
+
+        return card_elo_scores.mask(card_names.isna(), 0.0)
+
+    def get_cached_elo(self, card_name: str) -> Union[float, None]:
+        """
+        Get the ELO score of a card from the cache. Returns None if the card is not cached, has no score yet or its
+        score was last updated more than a day ago.
+
+        :param card_name: name of the card to get the ELO score for.
+        :return: the cached ELO score, if it can be used.
+        """
         cache_data = self.elo_cache.get(card_name)
-        today = datetime.today()
-        cube_updated_more_than_a_week_ago = False
+        if cache_data is None or cache_data.get('elo') is None:
+
+            return None
+
+        if cache_data.get('lastUpdated') and (datetime.today() - cache_data['lastUpdated']).days > 1:
+
+            return None
 
-        if cache_data and cache_data.get('lastUpdated'):
-            cube_updated_more_than_a_week_ago = (today - cache_data['lastUpdated']).days > 1
+        return cache_data['elo']
 
-        if cache_data is None or cache_data.get('elo') is None or cube_updated_more_than_a_week_ago:
-            await self.update_card_elo(card_name)
+    async def get_card_elo(self, card_name: str, session: Union[None, aiohttp.ClientSession] = None) -> float:
+        elo_score = self.get_cached_elo(card_name)
+
+        if elo_score is None:
+            if session is None:
+                async with aiohttp.ClientSession() as card_session:
+                    await self.update_card_elo(card_name, card_session)
+            else:
+                await self.update_card_elo(card_name, session)
             cache_data = self.elo_cache.get(card_name)
 
             if cache_data is None:
                 return -1.0
 
-        return cache_data["elo"]
+            elo_score = cache_data["elo"]
+
+        return elo_score
 
-    async def update_card_elo(self, card_name: str):
+    async def update_card_elo(self, card_name: str, session: aiohttp.ClientSession):
 
         try:
-            elo_score = await self.get_card_elo_from_cube_cobra(card_name)
+            elo_score = await self.get_card_elo_from_cube_cobra(card_name, session)
 
             if elo_score is not None or card_name not in self.elo_cache:
                 async with self.lock:
@@ -68,14 +132,14 @@ class ELOFetcher:
 
             return
 
-    async def get_card_elo_from_cube_cobra(self, card_name: str) -> float:
+    async def get_card_elo_from_cube_cobra(self, card_name: str, session: aiohttp.ClientSession) -> float:
         scryfall_data = await self.get_card_by_name_with_max_id(card_name)
         if "id" in scryfall_data:
-            elo_score = await self.get_elo_from_id_async(scryfall_data["id"])
+            elo_score = await self.get_elo_from_id_async(scryfall_data["id"], session)
         else:
             card_versions = self.scryfall_cache.get(card_name)
             if card_versions:
-                elo_score = await self.try_multiple_ids_for_elo(card_versions)
+                elo_score = await self.try_multiple_ids_for_elo(card_versions, session)
             else:
                 elo_score = 1200.0
 
@@ -106,18 +170,19 @@ class ELOFetcher:
 
         return max_card
 
-    async def get_elo_from_id_async(self, card_id: str) -> Union[float, None]:
+    async def get_elo_from_id_async(self, card_id: str, session: aiohttp.ClientSession) -> Union[float, None]:
         url = f"https://cubecobra.com/tool/card/{card_id}?tab=1"
-        html_content = await async_fetch_data(url)
-        matches = self.elo_pattern.findall(html_content)
-        if not matches:
+        async with self.request_semaphore:
+            html_content = await async_fetch_bytes(url, session)
+        match = self.elo_pattern.search(html_content)
+        if not match:
             logger.debug(f"Could not find any Elo data on card with ID {card_id}")
         else:
-            return float(self.elo_digit_pattern.findall(matches[0])[0])
+            return float(match.group(1))
 
-    async def try_multiple_ids_for_elo(self, card_versions) -> Union[float, None]:
+    async def try_multiple_ids_for_elo(self, card_versions, session: aiohttp.ClientSession) -> Union[float, None]:
         for card_version in card_versions:
             card_id = card_version["id"]
-            elo_score = await self.get_elo_from_id_async(card_id)
+            elo_score = await self.get_elo_from_id_async(card_id, session)
             if elo_score is not None:
                 return elo_score
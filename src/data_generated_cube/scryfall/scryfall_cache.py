@@ -150,8 +150,9 @@ class ScryfallCache:
         return foil_printing
 
     def get_extended_name(self, name: str) -> str:
-        extended_name_regex = f"{name}\s*\/\/.*"
-        post_extended_name_regex = f".*?\/\/\s*{name}"
+        escaped_name = re.escape(str(name))
+        extended_name_regex = f"{escaped_name}\s*\/\/.*"
+        post_extended_name_regex = f".*?\/\/\s*{escaped_name}"
         for card in self.cache:
             if re.match(extended_name_regex, card):
                 return card
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from src.data_generated_cube.create_cube.cube_creator import CubeCreator
+
+
+def make_creator(tmp_path) -> CubeCreator:
+    return CubeCreator(card_count=2, data_directory=tmp_path)
+
+
+def test_make_color_frame_ranks_nan_weighted_rank_last(tmp_path):
+    color_frame = pd.DataFrame({
+        'name': ['Unranked', 'Low', 'High'],
+        'Weighted Rank': [np.nan, 0.2, 0.9],
+        'Inclusion Rate': [0.9, 0.1, 0.5],
+        'ELO': [-1.0, 1100.0, 1300.0],
+    })
+
+    cards = make_creator(tmp_path).make_color_frame(color_frame, 2)
+
+    assert cards['name'].tolist() == ['High', 'Low']
+
+
+def test_make_color_frame_keeps_nan_weighted_rank_when_room(tmp_path):
+    color_frame = pd.DataFrame({
+        'name': ['Unranked', 'High'],
+        'Weighted Rank': [np.nan, 0.9],
+        'Inclusion Rate': [0.9, 0.5],
+        'ELO': [-1.0, 1300.0],
+    })
+
+    cards = make_creator(tmp_path).make_color_frame(color_frame, 3)
+
+    assert cards['name'].tolist() == ['High', 'Unranked']